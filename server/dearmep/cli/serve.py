@@ -32,7 +32,9 @@ def serve(ctx: Context) -> None:
         reload_excludes=["node_modules"],  # TODO: doesn't seem to be working
         log_config=ctx.args.log_config,
         log_level=ctx.args.log_level,
+        access_log=not ctx.args.no_access_log,
         proxy_headers=True,  # Parse headers from a reverse proxy.
+        http="httptools",  # Installed via uvicorn[standard].
     )
 
 
@@ -89,3 +91,10 @@ def add_parser(
         help="only display messages at or above this level (default: "
         f"{DEFAULT_LOG_LEVEL}; choices: {', '.join(LOG_LEVELS)})",
     )
+
+    parser.add_argument(
+        "--no-access-log",
+        action="store_true",
+        help="don't log every HTTP request (e.g. to reduce per-request "
+        "overhead under load)",
+    )
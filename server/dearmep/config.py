@@ -27,6 +27,7 @@ from pydantic import (
     DirectoryPath,
     Field,
     FilePath,
+    NonNegativeInt,
     PositiveInt,
     ValidationError,
     validator,
@@ -145,8 +146,19 @@ class ContactTimespanFilterConfig(BaseModel):
     timespans: dict[str, list[ContactTimespanFilterTimespan]]
 
 
+class DatabasePoolConfig(BaseModel):
+    """Connection pool settings, used for databases other than SQLite."""
+
+    size: PositiveInt = 20
+    max_overflow: NonNegativeInt = 10
+    timeout: PositiveInt = 30
+    recycle: int = 1800
+    pre_ping: bool = True
+
+
 class DatabaseConfig(BaseModel):
     url: str  # AnyUrl requires a host, which doesn't apply for SQLite.
+    pool: DatabasePoolConfig = Field(default_factory=DatabasePoolConfig)
 
 
 class L10nEntry(BaseModel):
@@ -329,6 +341,7 @@ class TelephonyConfig(BaseModel):
     connected_call_timeout: Union[PositiveInt, Literal[False]] = False
     provider: ElksConfig
     audio_source: Path
+    medialist_cache_dir: Optional[Path] = None
     always_connect_to: Optional[str]
     sms_sender_name: SMSSenderName
 
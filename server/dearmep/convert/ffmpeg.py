@@ -2,15 +2,19 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+import logging
 import subprocess  # noqa: S404
 from collections.abc import Generator, Iterable, Sequence
 from contextlib import ExitStack, contextmanager
-from tempfile import NamedTemporaryFile
-from typing import IO
+from tempfile import NamedTemporaryFile, TemporaryFile
+from typing import IO, Union
 
 from .blobfile import BlobOrFile
 
 
+_logger = logging.getLogger(__name__)
+
+
 def build_concat_list(files: Iterable[str]) -> bytes:
     """Build a "playlist" of files in ffmpeg's "concat" format."""
     return "\n".join(
@@ -86,6 +90,81 @@ def concat(
         yield output
 
 
+@contextmanager
+def concat_stream(
+    inputs: Iterable[BlobOrFile],
+    out_format: str,
+) -> Generator[IO[bytes], None, None]:
+    """Concatenate multiple ffmpeg input files into a stream.
+
+    This works like `concat`, but instead of writing the result to a temporary
+    file, ffmpeg writes it to a pipe that is returned for reading. The output
+    can therefore be consumed while ffmpeg is still working on it.
+
+    This is to be used as a context manager. Any temporary files for Blobs in
+    the input are created when entering the context, i.e. any database session
+    the input depends on only has to be open until then. When leaving the
+    context, ffmpeg is waited for, and `CalledProcessError` is raised if it
+    failed, after logging ffmpeg's error output. If the context is left
+    because of an exception, ffmpeg is killed.
+    """
+    # ffmpeg's error output goes to a file instead of a pipe, so that it can't
+    # block ffmpeg while nobody is reading it.
+    with build_concat_listfile(inputs) as clist, TemporaryFile() as errors:
+        proc = popen(
+            (
+                "-safe",
+                "0",  # accept absolute paths
+                "-i",
+                clist.name,  # input filename list
+                "-c",
+                "copy",  # only copy streams, don't re-encode
+                "-f",
+                out_format,  # specify the output format
+                "pipe:1",
+            ),
+            stderr=errors,
+        )
+        with proc:
+            try:
+                yield proc.stdout  # type: ignore[misc]
+            except BaseException:
+                proc.kill()
+                raise
+            # Drain anything the caller didn't read, else ffmpeg may block.
+            proc.stdout.read()  # type: ignore[union-attr]
+            if retcode := proc.wait():
+                errors.seek(0)
+                stderr = errors.read()
+                _logger.error(
+                    "ffmpeg failed with exit code %d: %s",
+                    retcode,
+                    stderr.decode(errors="replace").strip(),
+                )
+                raise subprocess.CalledProcessError(
+                    retcode, proc.args, stderr=stderr
+                )
+
+
+def popen(
+    args: Sequence[str],
+    *,
+    stderr: Union[int, IO[bytes]] = subprocess.DEVNULL,
+) -> subprocess.Popen:
+    """Start an ffmpeg subprocess that writes its output to a pipe."""
+    return subprocess.Popen(  # noqa: S603
+        (
+            "ffmpeg",
+            "-hide_banner",  # be less verbose
+            "-nostdin",  # noninteractive
+            *args,
+        ),
+        bufsize=0,  # unbuffered, so that reads return what's available
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+    )
+
+
 def run(
     args: Sequence[str],
     passthru: bool = False,
@@ -8,6 +8,8 @@ from __future__ import annotations
 from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
+from prometheus_client import Gauge
+from sqlalchemy.pool import QueuePool
 from sqlmodel import MetaData, Session, SQLModel, create_engine, select, text
 
 from ..config import Config
@@ -81,14 +83,36 @@ class AutoEngine:
     def get_engine(cls) -> Engine:
         if cls.engine is None:
             config = Config.get()
+            pool = config.database.pool
             cls.engine = (
                 cls.create_sqlite_engine(config)
                 if config.database.url.startswith("sqlite")
-                else create_engine(config.database.url)
+                else create_engine(
+                    config.database.url,
+                    pool_size=pool.size,
+                    max_overflow=pool.max_overflow,
+                    pool_timeout=pool.timeout,
+                    pool_recycle=pool.recycle,
+                    pool_pre_ping=pool.pre_ping,
+                )
             )
         return cls.engine
 
 
+def _checked_out_connections() -> float:
+    engine = AutoEngine.engine
+    if engine is None or not isinstance(engine.pool, QueuePool):
+        return 0
+    return engine.pool.checkedout()
+
+
+database_pool_checked_out = Gauge(
+    "database_pool_checked_out",
+    "Number of database connections currently checked out of the pool.",
+)
+database_pool_checked_out.set_function(_checked_out_connections)
+
+
 def get_metadata() -> MetaData:
     return SQLModel.metadata
 
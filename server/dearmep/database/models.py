@@ -17,6 +17,7 @@ from sqlmodel import (
     DateTime,
     Enum,
     Field,
+    Index,
     Relationship,
     SQLModel,
     String,
@@ -214,7 +215,6 @@ class Blob(SQLModel, ModifiedTimestampMixin, table=True):
         "Blob.",
     )
     type: str = Field(
-        index=True,
         description="A value to help organize Blobs into categories, e.g. "
         "`logo`, `portrait`, `name_audio` etc.",
         **_example("logo"),
@@ -339,6 +339,14 @@ class Call(SQLModel, table=True):
     __tablename__ = "calls"
     __table_args__ = (
         UniqueConstraint("provider", "provider_call_id", name="unique_call"),
+        # Only connected calls block their Destination, so that's all we need
+        # to look up when checking whether a Destination is in a call.
+        Index(
+            "ix_calls_connected_destination_id",
+            "destination_id",
+            sqlite_where=text("connected_at IS NOT NULL"),
+            postgresql_where=text("connected_at IS NOT NULL"),
+        ),
     )
     id: UUID4 = Field(
         primary_key=True,
@@ -353,7 +361,6 @@ class Call(SQLModel, table=True):
     provider_call_id: str = Field(
         description="The Provider's Call ID.",
         **_example("c4644bcfb44e712345c36e189faba04bd"),
-        index=True,
     )
     started_at: datetime = Field(
         sa_column=tz_datetime_column(),
@@ -463,7 +470,6 @@ class DestinationGroupBase(SQLModel):
         description="An ID to uniquely identify this Group.",
     )
     type: str = Field(
-        index=True,
         description="Which type of Group this is. Can be any string that "
         "makes sense for the campaign. Some suggested values are `parl_group` "
         "(parliamentary group, “Fraktion” in German), `party`, `committee`, "
@@ -638,7 +644,6 @@ class DestinationSelectionLogBase(SQLModel):
         description="ID of the destination that has been selected.",
     )
     user_id: Optional[UserPhone] = Field(
-        index=True,
         description="ID (i.e. hashed phone number) of User that relates to "
         "this log, if any.",
     )
@@ -647,7 +652,7 @@ class DestinationSelectionLogBase(SQLModel):
         description="ID of the phone call that relates to this log, if any.",
     )
     timestamp: Optional[datetime] = Field(
-        sa_column=auto_timestamp_column(index=True),
+        sa_column=auto_timestamp_column(),
         description="Timestamp of when the selection took place.",
     )
     event: DestinationSelectionLogEvent = Field(
@@ -661,6 +666,12 @@ class DestinationSelectionLogBase(SQLModel):
 
 class DestinationSelectionLog(DestinationSelectionLogBase, table=True):
     __tablename__ = "dest_select_log"
+    __table_args__ = (
+        # The log is queried for the latest or recent entries, either of
+        # certain event types or of a certain user.
+        Index("ix_dest_select_log_event_timestamp", "event", "timestamp"),
+        Index("ix_dest_select_log_user_id_timestamp", "user_id", "timestamp"),
+    )
     destination: Destination = Relationship()
 
 
@@ -17,7 +17,7 @@ from pydantic import UUID4
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.sql import label
-from sqlmodel import and_, case, col, column, delete, or_
+from sqlmodel import and_, case, col, column, delete, exists, or_
 
 from ..config import Config
 from ..convert.blobfile import BlobOrFile
@@ -39,8 +39,12 @@ from .connection import Session, select
 from .models import (
     Blob,
     BlobID,
+    Call,
     CurrentlyScheduledCalls,
     Destination,
+    DestinationGroup,
+    DestinationGroupID,
+    DestinationGroupLink,
     DestinationID,
     DestinationSelectionLog,
     DestinationSelectionLogEvent,
@@ -102,6 +106,18 @@ def get_blobs_by_names(
     return {blob.name: blob for blob in blobs}
 
 
+def get_blob_etags(
+    session: Session,
+    ids: list[BlobID],
+) -> dict[BlobID, UUID4]:
+    """Return the ETags of the given Blobs, without loading their data."""
+    return dict(
+        session.exec(
+            select(Blob.id, Blob.etag).where(col(Blob.id).in_(ids))
+        ).all()
+    )
+
+
 def get_destination_by_id(
     session: Session,
     id: DestinationID,
@@ -112,6 +128,25 @@ def get_destination_by_id(
     return dest
 
 
+def get_parl_group_id(
+    session: Session,
+    destination_id: DestinationID,
+) -> Optional[DestinationGroupID]:
+    """Return the ID of the Destination's parliamentary group, if any."""
+    return session.exec(
+        select(DestinationGroup.id)
+        .join(
+            DestinationGroupLink,
+            DestinationGroupLink.group_id == DestinationGroup.id,
+        )
+        .where(
+            DestinationGroupLink.destination_id == destination_id,
+            DestinationGroup.type == "parl_group",
+        )
+        .limit(1)
+    ).first()
+
+
 def get_destinations_by_country(
     session: Session,
     country: CountryCode,
@@ -286,17 +321,14 @@ def get_recommended_destination(  # noqa: C901, PLR0914
         Destination.base_endorsement >= MIN_ENDORSEMENT_CUTOFF,
     )
 
-    # exclude destinations in call by selecting
-    # all call events
-    # outter joining with CALL_ENDED events as last event per destination
-
-    # events designating a call is initiated
-    CALL_INITIATED = [  # noqa: N806
-        DestinationSelectionLogEvent.CALLING_DESTINATION,
-        DestinationSelectionLogEvent.CALLING_USER,
-        DestinationSelectionLogEvent.DESTINATION_CONNECTED,
-        DestinationSelectionLogEvent.IVR_SUGGESTED,
-    ]
+    # exclude destinations in call, in a single NOT EXISTS (this uses the same
+    # condition as `destination_is_in_call` in the ongoing calls tracking)
+    stmt_destinations = stmt_destinations.where(
+        ~exists().where(
+            Call.destination_id == Destination.id,
+            col(Call.connected_at).isnot(None),
+        )
+    )
 
     # events designating a call has ended
     CALL_ENDED = [  # noqa: N806
@@ -307,45 +339,6 @@ def get_recommended_destination(  # noqa: C901, PLR0914
         DestinationSelectionLogEvent.CALLING_USER_FAILED,
     ]
 
-    # subquery selecting all the latest timestamps of
-    # all CALL events (CALL_INITIATED + CALL_ENDED)
-
-    max_timestamps_subquery = (
-        select(  # type: ignore[call-overload]
-            DestinationSelectionLog,
-            func.max(DestinationSelectionLog.timestamp).label("max_timestamp"),
-        )
-        .where(
-            col(DestinationSelectionLog.event).in_(CALL_INITIATED + CALL_ENDED)
-        )
-        .group_by(DestinationSelectionLog.destination_id)
-        .subquery()
-    )
-
-    # join the selection logs with the latest timestamps of each destination_id
-    latest_logs_subquery = (
-        select(DestinationSelectionLog)
-        .join(
-            max_timestamps_subquery,
-            and_(
-                DestinationSelectionLog.destination_id
-                == max_timestamps_subquery.c.destination_id,
-                DestinationSelectionLog.timestamp
-                == max_timestamps_subquery.c.max_timestamp,
-            ),
-        )
-        .subquery()
-    )
-
-    # outer left join with all Destinations
-    stmt_destinations = stmt_destinations.outerjoin(
-        latest_logs_subquery,
-        or_(
-            Destination.id is None,  # there may be no logs
-            Destination.id == latest_logs_subquery.c.destination_id,
-        ),
-    )
-
     # get all destinations
     destinations = {
         dest.id: dest for dest in session.exec(stmt_destinations).all()
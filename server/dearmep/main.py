@@ -77,7 +77,10 @@ def create_app(config_dict: Optional[dict] = None) -> FastAPI:
         for task in schedules.get_background_tasks(config):
             _logger.info(f"Loading background Task: {task.__name__}")
             await task()
+        if not config.telephony.dry_run:
+            await elks.refresh_phone_numbers_periodically()
         yield
+        elks.ElksClient.close()
 
     app = FastAPI(
         title=APP_NAME,
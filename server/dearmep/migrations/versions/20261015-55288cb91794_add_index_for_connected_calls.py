@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+"""add partial index for connected calls
+
+Revision ID: 55288cb91794
+Revises: 5d2aefe5f0ad
+Create Date: 2026-10-15 10:12:41.302118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55288cb91794'
+down_revision: Union[str, None] = '5d2aefe5f0ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_calls_connected_destination_id', 'calls', ['destination_id'], unique=False, sqlite_where=sa.text('connected_at IS NOT NULL'), postgresql_where=sa.text('connected_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_calls_connected_destination_id', table_name='calls', sqlite_where=sa.text('connected_at IS NOT NULL'), postgresql_where=sa.text('connected_at IS NOT NULL'))
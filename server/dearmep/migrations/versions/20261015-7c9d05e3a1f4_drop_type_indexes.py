@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+"""drop unused indexes on blob and group types
+
+Revision ID: 7c9d05e3a1f4
+Revises: e41a7c2d9b58
+Create Date: 2026-10-15 16:02:51.270993
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c9d05e3a1f4'
+down_revision: Union[str, None] = 'e41a7c2d9b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_dest_groups_type', table_name='dest_groups')
+    op.drop_index('ix_blobs_type', table_name='blobs')
+
+
+def downgrade() -> None:
+    op.create_index('ix_blobs_type', 'blobs', ['type'], unique=False)
+    op.create_index('ix_dest_groups_type', 'dest_groups', ['type'], unique=False)
@@ -0,0 +1,40 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+"""composite indexes for destination selection log
+
+Revision ID: b3f1c6e0d2a7
+Revises: 55288cb91794
+Create Date: 2026-10-15 14:03:27.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c6e0d2a7'
+down_revision: Union[str, None] = '55288cb91794'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # dest_select_log can be large, don't block writes while indexing it.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_dest_select_log_event_timestamp', 'dest_select_log', ['event', 'timestamp'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_dest_select_log_user_id_timestamp', 'dest_select_log', ['user_id', 'timestamp'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_dest_select_log_user_id', table_name='dest_select_log', postgresql_concurrently=True)
+        op.drop_index('ix_dest_select_log_timestamp', table_name='dest_select_log', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_dest_select_log_timestamp', 'dest_select_log', ['timestamp'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_dest_select_log_user_id', 'dest_select_log', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_dest_select_log_user_id_timestamp', table_name='dest_select_log', postgresql_concurrently=True)
+        op.drop_index('ix_dest_select_log_event_timestamp', table_name='dest_select_log', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+"""drop redundant index on provider call ID
+
+Revision ID: e41a7c2d9b58
+Revises: b3f1c6e0d2a7
+Create Date: 2026-10-15 15:21:09.844310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41a7c2d9b58'
+down_revision: Union[str, None] = 'b3f1c6e0d2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_calls_provider_call_id', table_name='calls')
+
+
+def downgrade() -> None:
+    op.create_index('ix_calls_provider_call_id', 'calls', ['provider_call_id'], unique=False)
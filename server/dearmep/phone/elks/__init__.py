@@ -2,7 +2,12 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
-from .elks import mount_router
+from .elks import mount_router, refresh_phone_numbers_periodically
+from .utils import ElksClient
 
 
-__all__ = ["mount_router"]
+__all__ = [
+    "ElksClient",
+    "mount_router",
+    "refresh_phone_numbers_periodically",
+]
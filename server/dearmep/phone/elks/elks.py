@@ -3,22 +3,32 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+import atexit
 import logging
+import os
+import shutil
+from collections.abc import Iterator
+from contextlib import ExitStack, suppress
 from datetime import datetime, timedelta, timezone
-from typing import Any, Literal, Optional, Union
+from hashlib import sha256
+from itertools import chain
+from pathlib import Path
+from tempfile import NamedTemporaryFile, mkdtemp
+from time import monotonic
+from typing import Annotated, Any, Optional, Union
 
-import httpx
 from fastapi import (
     APIRouter,
-    Depends,
+    BackgroundTasks,
     FastAPI,
     Form,
-    HTTPException,
-    Request,
     status,
 )
-from fastapi.responses import FileResponse
-from pydantic import UUID4, Json
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi_restful.tasks import repeat_every
+from pydantic import UUID4
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from ...config import Config, Language
 from ...convert import blobfile, ffmpeg
@@ -26,7 +36,6 @@ from ...database import query
 from ...database.connection import Session, get_session
 from ...database.models import (
     Call,
-    Destination,
     DestinationSelectionLogEvent,
     ScheduledCall,
 )
@@ -34,7 +43,6 @@ from ...models import (
     CallState,
     CallType,
     DestinationInCallResponse,
-    PhoneNumber,
     Schedule,
     UserInCallResponse,
     UserPhone,
@@ -42,18 +50,124 @@ from ...models import (
 from .. import ivr
 from . import ongoing_calls
 from .metrics import elks_metrics
-from .models import InitialCallElkResponse, Number
-from .utils import choose_from_number, get_numbers
+from .models import HangupForm, InitialCallElkResponse, IVRForm
+from .utils import (
+    ElksClient,
+    PhoneNumbers,
+    choose_from_number,
+    get_numbers,
+)
 
 
 _logger = logging.getLogger(__name__)
 
 
-phone_numbers: list[Number] = []
+phone_numbers = PhoneNumbers(all=(), by_calling_code={}, by_country={})
 timeout = 9  # seconds
 establish_call_timeout = 45  # seconds
 menu_duration_timeout = 7  # minutes
+numbers_refresh_interval = 60 * 60  # seconds
 repeat = 2
+medialist_cache_size = 1000  # files
+medialist_path_ttl = 60  # seconds until a medialist's contents are rechecked
+
+
+class ElksOriginMiddleware:
+    """Make sure requests to our 46elks routes come from a 46elks IP.
+
+    This is plain ASGI middleware instead of a route dependency so that
+    refused requests are answered before any routing or dependency resolution
+    takes place.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        prefix: str,
+        allowed_ips: frozenset[str],
+    ) -> None:
+        self.app = app
+        self.prefix = prefix + "/"
+        self.allowed_ips = allowed_ips
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Match the path the way Starlette routes it, i.e. without the
+        # `root_path` the app might be mounted at.
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path + "/"):
+            path = path[len(root_path) :]
+        if not path.startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        client_ip = None if client is None else client[0]
+        if client_ip in self.allowed_ips:
+            await self.app(scope, receive, send)
+            return
+        _logger.debug("refusing %s, not a 46elks IP", client_ip)
+        response = JSONResponse(
+            {
+                "detail": {
+                    "error": "You don't look like an elk.",
+                    "client_ip": client_ip,
+                },
+            },
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+        await response(scope, receive, send)
+
+
+def refresh_phone_numbers() -> None:
+    """Fetch our phone numbers from 46elks and publish them.
+
+    The numbers are indexed by calling code and published as an object that
+    replaces the previous one in a single assignment. Concurrent readers will
+    therefore always see either the old or the new numbers, but never a
+    partially updated list or index.
+    """
+    global phone_numbers  # noqa: PLW0603
+    phone_numbers = PhoneNumbers.index(get_numbers())
+
+
+def prune_medialist_cache(cache_dir: Path) -> None:
+    """Delete all but the most recently used concatenated medialist files."""
+    files = []
+    for path in cache_dir.glob("[!.]*"):  # skip files in progress
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:  # pruned concurrently
+            continue
+    files.sort(reverse=True)
+    for _, path in files[medialist_cache_size:]:
+        path.unlink(missing_ok=True)
+
+
+def clear_medialist_cache_dir(cache_dir: Path) -> None:
+    """Delete the concatenated medialist files, including partial ones.
+
+    Only files named like the ones `stream_medialist` creates are deleted,
+    anything else in `cache_dir` is left alone.
+    """
+    for pattern in ("*.ogg", ".*.ogg.*"):
+        for path in cache_dir.glob(pattern):
+            if not path.is_file():
+                continue
+            with suppress(FileNotFoundError):  # deleted concurrently
+                path.unlink()
+
+
+refresh_phone_numbers_periodically = repeat_every(
+    seconds=numbers_refresh_interval,
+    wait_first=numbers_refresh_interval,
+    logger=_logger,
+)(refresh_phone_numbers)
 
 
 def send_sms(
@@ -62,15 +176,8 @@ def send_sms(
     from_title: str,
     message: str,
 ) -> None:
-    provider_cfg = Config.get().telephony.provider
-    auth = (
-        provider_cfg.username,
-        provider_cfg.password,
-    )
-    response = httpx.post(
-        url="https://api.46elks.com/a1/sms",
-        timeout=10,
-        auth=auth,
+    response = ElksClient.get().post(
+        "/sms",
         data={
             "from": from_title,
             "to": user_phone_number,
@@ -79,7 +186,7 @@ def send_sms(
     )
     if not response.is_success:
         _logger.critical(
-            f"46elks request to send sms failed: {response.status_code}"
+            "46elks request to send sms failed: %s", response.status_code
         )
         response.raise_for_status()
 
@@ -105,10 +212,6 @@ def start_elks_call(
     config = Config.get()
     provider_cfg = config.telephony.provider
     elks_url = config.api.base_url + "/phone"
-    auth = (
-        provider_cfg.username,
-        provider_cfg.password,
-    )
 
     if ongoing_calls.destination_is_in_call(destination_id, session):
         return DestinationInCallResponse()
@@ -123,10 +226,8 @@ def start_elks_call(
         phone_numbers=phone_numbers,
     )
 
-    response = httpx.post(
-        url="https://api.46elks.com/a1/calls",
-        timeout=10,
-        auth=auth,
+    response = ElksClient.get().post(
+        "/calls",
         data={
             "to": user_phone_number,
             "from": phone_number.number,
@@ -138,16 +239,14 @@ def start_elks_call(
 
     if not response.is_success:
         _logger.critical(
-            f"46elks request to start call failed: {response.status_code}"
+            "46elks request to start call failed: %s", response.status_code
         )
         return CallState.CALLING_USER_FAILED
 
-    response_data: InitialCallElkResponse = InitialCallElkResponse.parse_obj(
-        response.json()
-    )
+    response_data = InitialCallElkResponse.parse_raw(response.content)
 
     if response_data.state == "failed":
-        _logger.warn(f"Call failed from our number: {phone_number.number}")
+        _logger.warning("Call failed from our number: %s", phone_number.number)
         return CallState.CALLING_USER_FAILED
 
     ongoing_calls.add_call(
@@ -172,7 +271,7 @@ def start_elks_call(
     return CallState.CALLING_USER
 
 
-def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
+def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0914, PLR0915
     """Mount the 46elks router to the app"""
 
     # configuration and instantiation at mount time
@@ -180,44 +279,47 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
     telephony_cfg = config.telephony
     provider_cfg = telephony_cfg.provider
     provider = provider_cfg.provider_name
+    allowed_ips = frozenset(provider_cfg.allowed_ips)
     successful_call_duration = telephony_cfg.successful_call_duration
+    always_connect_to = telephony_cfg.always_connect_to
+    connected_call_timeout = telephony_cfg.connected_call_timeout
     elks_url = config.api.base_url + prefix
-    auth = (
-        provider_cfg.username,
-        provider_cfg.password,
-    )
-    if not config.telephony.dry_run:
-        phone_numbers.extend(
-            get_numbers(
-                phone_numbers=phone_numbers,
-                auth=auth,
-            )
-        )
+    # URLs of our routes, as handed out to 46elks, built only once
+    url_main_menu = f"{elks_url}/main_menu"
+    url_connect = f"{elks_url}/connect"
+    url_postpone = f"{elks_url}/postpone"
+    url_delete = f"{elks_url}/delete"
+    url_arguments = f"{elks_url}/arguments"
+    url_finalize_connect = f"{elks_url}/finalize_connect"
+    url_hangup = f"{elks_url}/hangup"
+    url_medialist = f"{elks_url}/medialist"
+    if not telephony_cfg.dry_run:
+        refresh_phone_numbers()
+    # Medialist IDs remembered from a previous app instance might refer to a
+    # different database.
+    ivr.clear_medialist_cache()
+    # Concatenated medialists are only kept for the lifetime of this instance.
+    if telephony_cfg.medialist_cache_dir is None:
+        medialist_cache_dir = Path(mkdtemp(prefix="dearmep-medialists-"))
+        atexit.register(shutil.rmtree, medialist_cache_dir, ignore_errors=True)
+    else:
+        medialist_cache_dir = telephony_cfg.medialist_cache_dir
+        medialist_cache_dir.mkdir(parents=True, exist_ok=True)
+        clear_medialist_cache_dir(medialist_cache_dir)
 
     # helpers
-    def verify_origin(request: Request) -> None:
-        """Makes sure the request is coming from a 46elks IP"""
-        client_ip = None if request.client is None else request.client.host
-        if client_ip not in provider_cfg.allowed_ips:
-            _logger.debug(f"refusing {client_ip}, not a 46elks IP")
-            raise HTTPException(
-                status.HTTP_403_FORBIDDEN,
-                {
-                    "error": "You don't look like an elk.",
-                    "client_ip": client_ip,
-                },
-            )
+    def medialist_url(medialist_id: UUID4) -> str:
+        return f"{url_medialist}/{medialist_id}/concat.ogg"
 
-    def get_group_id(destination: Destination) -> Optional[str]:
+    def get_group_id(destination_id: str, session: Session) -> Optional[str]:
         """
         Get the group id of the destinations 'parl_group'.
         If the destination has no parl_group, we return None.
         """
-        parl_group = [g for g in destination.groups if g.type == "parl_group"]
-        if not parl_group:
-            _logger.warning(f"Destination {destination.id} has no parl_group")
-            return None
-        return parl_group[0].id
+        group_id = query.get_parl_group_id(session, destination_id)
+        if group_id is None:
+            _logger.warning("Destination %s has no parl_group", destination_id)
+        return group_id
 
     def sanity_check(
         result: str,
@@ -239,8 +341,9 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             medialist_id = ivr.prepare_medialist(
                 session, playlist, call.user_language
             )
+            session.commit()
             return {
-                "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                "play": medialist_url(medialist_id),
             }
         duration_of_call = datetime.now(timezone.utc) - call.started_at
         if duration_of_call >= timedelta(minutes=menu_duration_timeout):
@@ -248,9 +351,10 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             medialist_id = ivr.prepare_medialist(
                 session, playlist, call.user_language
             )
+            session.commit()
             elks_metrics.inc_menu_limit()
             return {
-                "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                "play": medialist_url(medialist_id),
             }
         return None
 
@@ -286,7 +390,7 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             medialist_id = ivr.prepare_medialist(session, playlist, language)
             wrong_input_response = {
                 str(number): {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                     "next": invalid_next,
                 }
                 for number in range(10)
@@ -300,29 +404,30 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
 
         return response
 
-    def forward_to(local_route: str, session: Session) -> dict:
+    def forward_to(next_url: str, session: Session) -> dict:
         medialist_id = ivr.prepare_medialist(session, ivr.silence(), "")
+        session.commit()
         return {
-            "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-            "next": f"{elks_url}/{local_route}",
+            "play": medialist_url(medialist_id),
+            "next": next_url,
         }
 
     # Router and routes
+    # The IVR routes return small dicts of strings and numbers that 46elks
+    # interprets. We set `response_model=None` on them to spare FastAPI from
+    # validating these against their `dict` return annotation every time.
+    app.add_middleware(
+        ElksOriginMiddleware, prefix=prefix, allowed_ips=allowed_ips
+    )
+
     router = APIRouter(
-        dependencies=[Depends(verify_origin)],
         include_in_schema=False,
         prefix=prefix,
     )
 
-    @router.post("/main_menu")
-    def main_menu(  # noqa: PLR0911, PLR0913
-        *,
-        callid: str = Form(),
-        direction: Literal["incoming", "outgoing"] = Form(),  # noqa: ARG001
-        from_number: PhoneNumber = Form(alias="from"),  # noqa: ARG001
-        to_number: PhoneNumber = Form(alias="to"),
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+    @router.post("/main_menu", response_model=None)
+    def main_menu(  # noqa: PLR0911
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         """
         Playback the intro in IVR
@@ -331,51 +436,48 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
         """
 
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
-            if call.type == CallType.INSTANT:
+            if call.type is CallType.INSTANT:
                 valid_input = [1, 5]
-                if result == "1":
-                    return forward_to("connect", session)
-                if result == "5":
-                    return forward_to("arguments", session)
+                if form.result == "1":
+                    return forward_to(url_connect, session)
+                if form.result == "5":
+                    return forward_to(url_arguments, session)
                 playlist = ivr.main_menu(destination_id=call.destination_id)
 
             else:
-                if result == "1":
-                    return forward_to("connect", session)
-                if result == "2":
-                    return forward_to("postpone", session)
-                if result == "3":
+                if form.result == "1":
+                    return forward_to(url_connect, session)
+                if form.result == "2":
+                    return forward_to(url_postpone, session)
+                if form.result == "3":
                     # if the User only has one call scheduled we delete it.
                     # else we send them to the delete menu
-                    schedule = query.get_schedule(session, to_number)
+                    schedule = query.get_schedule(session, form.to_number)
                     if len(schedule) == 1:
                         query.set_schedule(
-                            session, to_number, call.user_language, []
+                            session, form.to_number, call.user_language, []
                         )
-                        session.commit()
                         playlist = ivr.deleted_all_scheduled_calls()
                         medialist_id = ivr.prepare_medialist(
                             session, playlist, call.user_language
                         )
+                        session.commit()
                         return {
-                            "play": (
-                                f"{elks_url}/medialist/{medialist_id}/"
-                                "concat.ogg"
-                            ),
+                            "play": medialist_url(medialist_id),
                         }
-                    return forward_to("delete", session)
+                    return forward_to(url_delete, session)
 
-                if result == "5":
-                    return forward_to("arguments", session)
+                if form.result == "5":
+                    return forward_to(url_arguments, session)
                 valid_input = [1, 2, 3, 5]
                 playlist = ivr.main_menu(
                     destination_id=call.destination_id,
                     scheduled=True,
-                    group_id=get_group_id(call.destination),
+                    group_id=get_group_id(call.destination_id, session),
                 )
 
             medialist_id = ivr.prepare_medialist(
@@ -384,7 +486,7 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
 
             response = prepare_response(
                 valid_input=valid_input,
-                invalid_next=f"{elks_url}/main_menu",
+                invalid_next=url_main_menu,
                 language=call.user_language,
                 session=session,
             )
@@ -400,21 +502,15 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
 
         response.update(
             {
-                "ivr": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                "next": f"{elks_url}/main_menu",
+                "ivr": medialist_url(medialist_id),
+                "next": url_main_menu,
             }
         )
         return response
 
-    @router.post("/connect")
-    def connect(  # noqa: PLR0913
-        *,
-        callid: str = Form(),
-        direction: Literal["incoming", "outgoing"] = Form(),  # noqa: ARG001
-        from_number: PhoneNumber = Form(alias="from"),  # noqa: ARG001
-        to_number: PhoneNumber = Form(alias="to"),  # noqa: ARG001
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+    @router.post("/connect", response_model=None)
+    def connect(
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         """
         User wants to get connected to MEP
@@ -426,12 +522,12 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
         [2]: try again later, quit
         """
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
             # we get keypress [1] if a new suggestion is accepted
-            if result == "1":
+            if form.result == "1":
                 playlist = ivr.connecting()
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
@@ -445,21 +541,22 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
                 )
                 session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/finalize_connect",
+                    "play": medialist_url(medialist_id),
+                    "next": url_finalize_connect,
                 }
             # we get keypress [2] if the user wants to rather quit now
-            if result == "2":
+            if form.result == "2":
                 playlist = (
                     ivr.try_again_later()
-                    if (call.type == CallType.INSTANT)
+                    if (call.type is CallType.INSTANT)
                     else ivr.we_will_call_again()
                 )
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
                 )
+                session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                 }
 
             if not ongoing_calls.destination_is_in_call(
@@ -479,8 +576,8 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
                 )
                 session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/finalize_connect",
+                    "play": medialist_url(medialist_id),
+                    "next": url_finalize_connect,
                 }
 
             # MEP is in our list of ongoing calls: we get a new suggestion
@@ -502,17 +599,17 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
                 )
                 session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/hangup",
+                    "play": medialist_url(medialist_id),
+                    "next": url_hangup,
                 }
 
             # we ask the user if they want to talk to the new suggested MEP
             # instead
             ongoing_calls.remove_call(call, session)
 
-            ongoing_calls.add_call(
+            call = ongoing_calls.add_call(
                 provider=provider,
-                provider_call_id=callid,
+                provider_call_id=form.callid,
                 user_language=call.user_language,
                 user_id=call.user_id,
                 destination_id=new_destination.id,
@@ -520,39 +617,32 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
                 started_at=call.started_at,
                 session=session,
             )
-            call = ongoing_calls.get_call(callid, provider, session)
 
             playlist = ivr.mep_unavailable_new_suggestion(
                 destination_id=call.destination_id,
-                group_id=get_group_id(new_destination),
+                group_id=get_group_id(new_destination.id, session),
             )
             medialist_id = ivr.prepare_medialist(
                 session, playlist, call.user_language
             )
-            session.commit()
-
             response = prepare_response(
                 valid_input=[1, 2],
-                invalid_next=f"{elks_url}/connect",
+                invalid_next=url_connect,
                 language=call.user_language,
                 session=session,
             )
+            session.commit()
             response.update(
                 {
-                    "ivr": f"{elks_url}/medialist"
-                    f"/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/connect",
+                    "ivr": medialist_url(medialist_id),
+                    "next": url_connect,
                 }
             )
             return response
 
-    @router.post("/postpone")
+    @router.post("/postpone", response_model=None)
     def postpone(
-        callid: str = Form(),
-        from_number: PhoneNumber = Form(alias="from"),  # noqa: ARG001
-        to_number: PhoneNumber = Form(alias="to"),
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         """
         Playback the postpone in IVR
@@ -571,38 +661,39 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             return schedule[0].day
 
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
-            if result == "1":
+            if form.result == "1":
                 try:
-                    query.postpone_call(session, to_number)
+                    query.postpone_call(session, form.to_number)
                 except query.NotFound:
                     _logger.exception("Postponing call failed")
                     return {"hangup": "reject"}
-                session.commit()
                 playlist = ivr.postpone_snoozed()
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
                 )
+                session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                 }
-            if result == "2":
+            if form.result == "2":
                 playlist = ivr.postpone_skipped()
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
                 )
+                session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                 }
-            if result == "3":
-                return forward_to("delete", session)
+            if form.result == "3":
+                return forward_to(url_delete, session)
 
-            schedule = query.get_schedule(session, to_number)
+            schedule = query.get_schedule(session, form.to_number)
 
-            is_postponed = query.call_is_postponed(session, to_number)
+            is_postponed = query.call_is_postponed(session, form.to_number)
 
             if len(schedule) > 1:
                 next_weekday = _next_scheduled_weekday(schedule)
@@ -625,25 +716,22 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             valid_input = [2, 3] if is_postponed else [1, 2, 3]
             response = prepare_response(
                 valid_input=valid_input,
-                invalid_next=f"{elks_url}/postpone",
+                invalid_next=url_postpone,
                 language=call.user_language,
                 session=session,
             )
+            session.commit()
             response.update(
                 {
-                    "ivr": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/postpone",
+                    "ivr": medialist_url(medialist_id),
+                    "next": url_postpone,
                 }
             )
             return response
 
-    @router.post("/delete")
+    @router.post("/delete", response_model=None)
     def delete(
-        callid: str = Form(),
-        from_number: PhoneNumber = Form(alias="from"),  # noqa: ARG001
-        to_number: PhoneNumber = Form(alias="to"),
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         """
         Playback the delete menu in IVR
@@ -652,39 +740,41 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
         """
 
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
             today = datetime.now(tz=timezone.utc).isoweekday()
-            schedule = query.get_schedule(session, to_number)
+            schedule = query.get_schedule(session, form.to_number)
 
-            if result == "1":
-                query.set_schedule(session, to_number, call.user_language, [])
-                session.commit()
+            if form.result == "1":
+                query.set_schedule(
+                    session, form.to_number, call.user_language, []
+                )
                 playlist = ivr.deleted_all_scheduled_calls()
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
                 )
+                session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                 }
-            if result == "2":
+            if form.result == "2":
                 new_schedule = [
                     Schedule(day=s.day, start_time=s.start_time)
                     for s in schedule
                     if s.day != today
                 ]
                 query.set_schedule(
-                    session, to_number, call.user_language, new_schedule
+                    session, form.to_number, call.user_language, new_schedule
                 )
-                session.commit()
                 playlist = ivr.deleted_todays_scheduled_call(day=today)
                 medialist_id = ivr.prepare_medialist(
                     session, playlist, call.user_language
                 )
+                session.commit()
                 return {
-                    "play": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
+                    "play": medialist_url(medialist_id),
                 }
 
             # if no other calls scheduled we don't land here
@@ -694,25 +784,22 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             )
             response = prepare_response(
                 valid_input=[1, 2],
-                invalid_next=f"{elks_url}/delete",
+                invalid_next=url_delete,
                 language=call.user_language,
                 session=session,
             )
+            session.commit()
             response.update(
                 {
-                    "ivr": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/delete",
+                    "ivr": medialist_url(medialist_id),
+                    "next": url_delete,
                 }
             )
             return response
 
-    @router.post("/arguments")
+    @router.post("/arguments", response_model=None)
     def arguments(
-        callid: str = Form(),
-        from_number: PhoneNumber = Form(alias="from"),  # noqa: ARG001
-        to_number: PhoneNumber = Form(alias="to"),  # noqa: ARG001
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         """
         Playback the arguments in IVR
@@ -720,61 +807,61 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
         """
 
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
-            if result == "1":
-                return forward_to("connect", session)
+            if form.result == "1":
+                return forward_to(url_connect, session)
 
             playlist = ivr.arguments(destination_id=call.destination_id)
+            # The arguments are shuffled, don't let them clutter the cache.
             medialist_id = ivr.prepare_medialist(
-                session, playlist, call.user_language
+                session, playlist, call.user_language, cache=False
             )
 
             response = prepare_response(
                 valid_input=[1],
-                invalid_next=f"{elks_url}/arguments",
+                invalid_next=url_arguments,
                 language=call.user_language,
                 session=session,
             )
+            session.commit()
             response.update(
                 {
-                    "ivr": f"{elks_url}/medialist/{medialist_id}/concat.ogg",
-                    "next": f"{elks_url}/arguments",
+                    "ivr": medialist_url(medialist_id),
+                    "next": url_arguments,
                 }
             )
             return response
 
-    @router.post("/finalize_connect")
-    def finalize_connect(  # noqa: PLR0913
-        *,
-        callid: str = Form(),
-        direction: Literal["incoming", "outgoing"] = Form(),  # noqa: ARG001
-        from_number: PhoneNumber = Form(alias="from"),
-        to_number: PhoneNumber = Form(alias="to"),  # noqa: ARG001
-        result: str = Form(),
-        why: Optional[str] = Form(default=None),
+    @router.post("/finalize_connect", response_model=None)
+    def finalize_connect(
+        form: Annotated[IVRForm, Form()],
     ) -> dict:
         with get_session() as session:
-            call = ongoing_calls.get_call(callid, provider, session)
-            if response := sanity_check(result, why, call, session):
+            call = ongoing_calls.get_call(form.callid, provider, session)
+            if response := sanity_check(form.result, form.why, call, session):
                 return response
 
-            connect_number = ongoing_calls.get_mep_number(call)
-
-            elks_metrics.inc_start(
-                destination_number=connect_number, our_number=from_number
-            )
-            ongoing_calls.connect_call(call, session)
+            connect_number = ongoing_calls.get_mep_number(call, session)
             connect: dict[str, Union[str, int]] = {
                 "connect": connect_number,
             }
-            if telephony_cfg.always_connect_to:
-                connect["connect"] = telephony_cfg.always_connect_to
-            if telephony_cfg.connected_call_timeout:
-                connect["timelimit"] = telephony_cfg.connected_call_timeout
+            if always_connect_to:
+                connect["connect"] = always_connect_to
+            if connected_call_timeout:
+                connect["timelimit"] = connected_call_timeout
+
+            # A repeated webhook for a call we already connected gets the same
+            # answer, but must not count or log the connection a second time.
+            if call.connected_at is not None:
+                return connect
 
+            elks_metrics.inc_start(
+                destination_number=connect_number, our_number=form.from_number
+            )
+            ongoing_calls.connect_call(call, session)
             query.log_destination_selection(
                 session=session,
                 destination=call.destination,
@@ -786,86 +873,70 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
             return connect
 
     @router.post("/hangup")
-    def hangup(  # noqa: PLR0913
-        *,
-        # Arguments always present, also failures
-        direction: Literal["incoming", "outgoing"] = Form(),
-        created: datetime = Form(),  # noqa: ARG001
-        from_number: PhoneNumber = Form(alias="from"),
-        callid: str = Form(alias="id"),
-        to_number: PhoneNumber = Form(alias="to"),  # noqa: ARG001
-        state: str = Form(),
-        # Arguments present in some cases, i.e. success
-        start: Optional[datetime] = Form(default=None),
-        actions: Optional[Json] = Form(default=None),  # noqa: ARG001
-        cost: Optional[int] = Form(default=None),  # in 100 = 1 cent
-        duration: Optional[int] = Form(default=None),  # in sec  # noqa: ARG001
-        legs: Optional[Json] = Form(default=None),  # noqa: ARG001
+    def hangup(
+        form: Annotated[HangupForm, Form()],
+        background_tasks: BackgroundTasks,
     ) -> None:
         """
         Handles the hangup and cleanup of calls
         Always gets called in the end of calls, no matter their outcome.
         Route for hangups
         """
+        callid = form.callid
         # If start doesn't exist this is an error message and should
         # be logged. We finish the call in our call tracking table
-        if not start:
+        if not form.start:
             _logger.critical(
-                f"Call id: {callid} failed. "
-                f"state: {state}, direction: {direction}"
+                "Call id: %s failed. state: %s, direction: %s",
+                callid,
+                form.state,
+                form.direction,
             )
 
         with get_session() as session:
-            try:
-                call = ongoing_calls.get_call(callid, provider, session)
-            except ongoing_calls.CallError:
+            # Take the call out of the ongoing calls right away, so that a
+            # duplicate hangup webhook for it is a no-op.
+            call = ongoing_calls.pop_call(callid, provider, session)
+            if call is None:
                 _logger.warning(
-                    f"Call id: {callid} not found in ongoing calls. "
+                    "Call id: %s not found in ongoing calls. "
                     "This means we didn't get to write the call to our db "
-                    "after initialisation."
+                    "after initialisation, or its hangup has already been "
+                    "handled.",
+                    callid,
                 )
                 return
 
+            duration = None
             if call.connected_at:
                 connected_seconds = (
                     datetime.now(timezone.utc) - call.connected_at
                 ).total_seconds()
-                elks_metrics.observe_connect_time(
-                    destination_id=call.destination_id,
-                    duration=round(connected_seconds),
-                )
+                duration = round(connected_seconds)
                 if connected_seconds <= successful_call_duration:
                     event = DestinationSelectionLogEvent.FINISHED_SHORT_CALL
                 else:
                     event = DestinationSelectionLogEvent.FINISHED_CALL
-                query.log_destination_selection(
-                    session=session,
-                    destination=call.destination,
-                    event=event,
-                    user_id=call.user_id,
-                    call_id=call.provider_call_id,
-                )
-                session.commit()
             else:
-                query.log_destination_selection(
-                    session=session,
-                    destination=call.destination,
-                    event=DestinationSelectionLogEvent.CALL_ABORTED,
-                    user_id=call.user_id,
-                    call_id=call.provider_call_id,
-                )
-                session.commit()
-            if cost:
-                elks_metrics.observe_cost(
-                    destination_id=call.destination_id, cost=cost
-                )
-            elks_metrics.inc_end(
-                destination_number=call.destination_id, our_number=from_number
+                event = DestinationSelectionLogEvent.CALL_ABORTED
+            query.log_destination_selection(
+                session=session,
+                destination=call.destination,
+                event=event,
+                user_id=call.user_id,
+                call_id=call.provider_call_id,
+            )
+            # 46elks only waits for our response, the metrics can wait.
+            background_tasks.add_task(
+                elks_metrics.observe_call_end,
+                destination_id=call.destination_id,
+                our_number=form.from_number,
+                duration=duration,
+                cost=form.cost,
             )
-            ongoing_calls.remove_call(call, session)
 
             # error
-            if not start:
+            if not form.start:
                 query.log_destination_selection(
                     session=session,
                     destination=call.destination,
@@ -873,19 +944,120 @@ def mount_router(app: FastAPI, prefix: str) -> None:  # noqa: C901, PLR0915
                     user_id=call.user_id,
                     call_id=call.provider_call_id,
                 )
-                session.commit()
+            # Removing the call and logging its end is a single transaction.
+            session.commit()
 
-    @router.get("/medialist/{medialist_id}/concat.ogg")
-    def get_concatenated_media(medialist_id: UUID4) -> FileResponse:
-        """Get a concatenated media list as a stream for 46 elks IVR"""
+    def stream_medialist(medialist_id: UUID4, path: Path) -> Iterator[bytes]:
+        """Concatenate a medialist, yielding and caching it at `path`.
 
+        The output is written to a temporary file next to `path` while being
+        streamed and is only moved into place once ffmpeg has succeeded. If
+        the client goes away or ffmpeg fails, the temporary file is removed.
+        """
+        with ExitStack() as stack:
+            # Entered first, so that it is closed after ffmpeg is waited for.
+            cache = stack.enter_context(
+                NamedTemporaryFile(
+                    "wb",
+                    dir=path.parent,
+                    prefix=f".{path.name}.",
+                    delete=False,
+                )
+            )
+            tmp_path = Path(cache.name)
+            try:
+                # The session is only needed to extract the Blobs into files.
+                with get_session() as session:
+                    medialist = query.get_medialist_by_id(
+                        session, medialist_id
+                    )
+                    stdout = stack.enter_context(
+                        ffmpeg.concat_stream(
+                            (
+                                blobfile.BlobOrFile.from_medialist_item(
+                                    item, session=session
+                                )
+                                for item in medialist.items
+                            ),
+                            medialist.format,
+                        )
+                    )
+                while chunk := stdout.read(65536):
+                    cache.write(chunk)
+                    yield chunk
+                stack.close()  # wait for ffmpeg, then close the cache file
+                tmp_path.replace(path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        prune_medialist_cache(medialist_cache_dir)
+
+    def medialist_cache_path(medialist_id: UUID4) -> Path:
+        """Return where to cache the medialist's concatenated audio.
+
+        The file name is derived from the medialist's contents: the ETags of
+        its Blobs and the modification times and sizes of its files. If any of
+        them is updated, the medialist therefore maps to a new file.
+        """
         with get_session() as session:
             medialist = query.get_medialist_by_id(session, medialist_id)
-            items = [
-                blobfile.BlobOrFile.from_medialist_item(item, session=session)
-                for item in medialist.items
-            ]
-        with ffmpeg.concat(items, medialist.format, delete=False) as concat:
-            return FileResponse(concat.name, media_type=medialist.mimetype)
+            etags = query.get_blob_etags(
+                session,
+                [item for item in medialist.items if isinstance(item, int)],
+            )
+        key = sha256(medialist.format.encode())
+        for item in medialist.items:
+            if isinstance(item, int):
+                key.update(f"blob {item} {etags.get(item)}\n".encode())
+                continue
+            try:
+                stat = Path(item).stat()
+            except FileNotFoundError:  # ffmpeg will complain about it
+                key.update(f"file {item}\n".encode())
+                continue
+            key.update(
+                f"file {item} {stat.st_mtime_ns} {stat.st_size}\n".encode()
+            )
+        return medialist_cache_dir / f"{key.hexdigest()}.ogg"
+
+    # Maps medialist IDs to their `medialist_cache_path` and its expiry time.
+    # Only used from the event loop, so no locking is needed.
+    medialist_paths: dict[UUID4, tuple[Path, float]] = {}
+
+    @router.get("/medialist/{medialist_id}/concat.ogg", response_model=None)
+    async def get_concatenated_media(
+        medialist_id: UUID4,
+    ) -> Union[FileResponse, StreamingResponse]:
+        """Get a concatenated media list as a file for 46 elks IVR
+
+        Each medialist is only concatenated once per version of its audio,
+        and then served from `medialist_cache_dir`, see
+        `medialist_cache_path`. That path is remembered for
+        `medialist_path_ttl` seconds, so that serving a cached file usually
+        needs neither the database nor a thread. Changed audio is therefore
+        picked up after at most that long. On a cache miss, ffmpeg's output is
+        streamed to 46elks as it is being produced and written to the cache at
+        the same time.
+        """
+        now = monotonic()
+        cached = medialist_paths.get(medialist_id)
+        if cached is not None and cached[1] > now:
+            path = cached[0]
+        else:
+            path = await run_in_threadpool(medialist_cache_path, medialist_id)
+            if len(medialist_paths) >= medialist_cache_size:
+                medialist_paths.clear()
+            medialist_paths[medialist_id] = (path, now + medialist_path_ttl)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            chunks = stream_medialist(medialist_id, path)
+            # Start ffmpeg in a thread and only respond once there is output,
+            # so that errors can still result in an error response.
+            first = await run_in_threadpool(next, chunks, b"")
+            return StreamingResponse(
+                chain((first,), chunks), media_type="audio/ogg"
+            )
+        return FileResponse(path, media_type="audio/ogg")
 
     app.include_router(router)
@@ -3,7 +3,10 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+from typing import Any, Optional
+
 from prometheus_client import Counter, Summary
+from prometheus_client.metrics import MetricWrapperBase
 
 from ...models import UserPhone
 
@@ -52,17 +55,21 @@ class ElksMetrics:
         labelnames=("provider", "country"),
     )
 
-    def observe_connect_time(self, destination_id: str, duration: int) -> None:
-        """Track the connected calltime of user to MEP in seconds"""
-        self.call_duration_seconds.labels(
-            provider=self.provider, destination_id=destination_id
-        ).observe(duration)
+    def __init__(self) -> None:
+        # Labelled children, keyed by metric and label values, see `_labels`.
+        self._children: dict[tuple[Any, ...], Any] = {}
 
-    def observe_cost(self, destination_id: str, cost: int) -> None:
-        """Track how much the call cost"""
-        self.call_cost_euros.labels(
-            provider=self.provider, destination_id=destination_id
-        ).observe(cost / 10_000)
+    def _labels(self, metric: MetricWrapperBase, **labels: str) -> Any:  # noqa: ANN401
+        """Return the metric's child for these labels, caching it.
+
+        Looking up an existing child in a plain dict spares us the label
+        validation and locking that `metric.labels()` does on every call. The
+        labels have to be passed in the same order on every call.
+        """
+        key = (id(metric), *labels.values())
+        if (child := self._children.get(key)) is None:
+            child = self._children[key] = metric.labels(**labels)
+        return child
 
     def inc_start(self, destination_number: str, our_number: str) -> None:
         """Track a started call to MEP"""
@@ -72,11 +79,35 @@ class ElksMetrics:
             our_number=our_number,
         ).inc()
 
-    def inc_end(self, destination_number: str, our_number: str) -> None:
-        """Track an ended call to MEP"""
-        self.call_end_total.labels(
+    def observe_call_end(
+        self,
+        *,
+        destination_id: str,
+        our_number: str,
+        duration: Optional[int],
+        cost: Optional[int],
+    ) -> None:
+        """Track an ended call to MEP, with its connected time and cost
+
+        `duration` is the connected calltime of user to MEP in seconds, None if
+        they never got connected. `cost` is what 46elks charged for the call.
+        """
+        if duration is not None:
+            self._labels(
+                self.call_duration_seconds,
+                provider=self.provider,
+                destination_id=destination_id,
+            ).observe(duration)
+        if cost:
+            self._labels(
+                self.call_cost_euros,
+                provider=self.provider,
+                destination_id=destination_id,
+            ).observe(cost / 10_000)
+        self._labels(
+            self.call_end_total,
             provider=self.provider,
-            destination_number=destination_number,
+            destination_number=destination_id,
             our_number=our_number,
         ).inc()
 
@@ -3,15 +3,20 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
+from ...models import PhoneNumber
+
 
 InitialElkResponseState = Literal["ongoing", "success", "busy", "failed"]
 
 
 class InitialCallElkResponse(BaseModel):
+    class Config:
+        allow_mutation = False
+
     callid: str = Field(alias="id")
     created: datetime
     direction: Literal["incoming", "outgoing"]
@@ -21,6 +26,9 @@ class InitialCallElkResponse(BaseModel):
 
 
 class Number(BaseModel):
+    class Config:
+        allow_mutation = False  # shared between requests, see PhoneNumbers
+
     country: str
     expires: datetime
     number: str
@@ -29,3 +37,36 @@ class Number(BaseModel):
     active: Literal["yes", "no"]
     allocated: datetime
     id: str
+
+
+class IVRForm(BaseModel):
+    """The form data 46elks sends to the `next` URL of our IVR menus."""
+
+    callid: str
+    direction: Optional[Literal["incoming", "outgoing"]] = None
+    from_number: PhoneNumber = Field(alias="from")
+    to_number: PhoneNumber = Field(alias="to")
+    result: str
+    why: Optional[str] = None
+
+
+class HangupForm(BaseModel):
+    """The form data 46elks sends to our `whenhangup` URL.
+
+    Declared as a single model so that FastAPI can validate the whole form in
+    one go, instead of resolving every field as a separate parameter.
+    """
+
+    # Fields always present, also failures
+    direction: Literal["incoming", "outgoing"]
+    created: datetime
+    from_number: PhoneNumber = Field(alias="from")
+    callid: str = Field(alias="id")
+    to_number: PhoneNumber = Field(alias="to")
+    state: str
+    # Fields present in some cases, i.e. success. 46elks also sends `actions`
+    # and `legs` as JSON, but since we don't use them, we don't declare them
+    # here and thereby avoid parsing them on every hangup.
+    start: Optional[datetime] = None
+    cost: Optional[int] = None  # in 100 = 1 cent
+    duration: Optional[int] = None  # in sec
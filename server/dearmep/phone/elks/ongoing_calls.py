@@ -2,16 +2,28 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+"""Tracking of calls that are currently ongoing.
+
+Ongoing calls are not held in process memory, but in the `calls` table. This
+makes them visible to every worker process and leaves concurrency control to
+the database: Lookups by call ID go through the index of the `unique_call`
+constraint instead of scanning, and adding the same call twice fails on that
+constraint instead of silently creating a duplicate.
+
+None of the functions here commit; the caller is expected to commit once it
+has made all of its changes, e.g. also logged the call's events.
+"""
+
 from datetime import datetime, timezone
-from typing import cast
+from typing import Optional, cast
 
-from sqlalchemy import and_, select
+from sqlalchemy import delete, exists, select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import joinedload
 from sqlmodel import Session, col
 
 from ...config import Language
-from ...database.models import Call, Destination
+from ...database.models import Call, Contact
 from ...models import CallType, UserPhone
 
 
@@ -30,9 +42,7 @@ def get_call(
             session.query(Call)
             .filter(Call.provider_call_id == callid)
             .filter(Call.provider == provider)
-            .options(
-                joinedload(Call.destination).joinedload(Destination.contacts)
-            )
+            .options(joinedload(Call.destination))
             .one(),
         )
     except NoResultFound as e:
@@ -40,37 +50,58 @@ def get_call(
 
 
 def remove_call(call: Call, session: Session) -> None:
-    """removes a call from the database"""
+    """removes a call from the database
+
+    The deletion is flushed right away, so that a new call with the same ID
+    can be added in the same transaction.
+    """
     session.delete(call)
-    session.commit()
+    session.flush()
+
+
+def pop_call(
+    callid: str,
+    provider: str,
+    session: Session,
+) -> Optional[Call]:
+    """removes a call from the database and returns it
+
+    Returns None if the call does not exist (anymore). Since the row is only
+    counted as popped if our DELETE actually removed it, a concurrent request
+    for the same call (e.g. a duplicate webhook) waits for our transaction and
+    then gets None instead of the same call a second time. The returned call is
+    detached from the session.
+    """
+    try:
+        call = get_call(callid, provider, session)
+    except CallError:
+        return None
+    result = session.execute(delete(Call).where(Call.id == call.id))
+    session.expunge(call)
+    if result.rowcount != 1:
+        return None
+    return call
 
 
 def connect_call(call: Call, session: Session) -> None:
     """sets a call as connected in database"""
     call.connected_at = datetime.now(timezone.utc)
     session.add(call)
-    session.commit()
 
 
 def destination_is_in_call(destination_id: str, session: Session) -> bool:
     """returns True if the destination is in a call"""
-    stmt = (
-        select(Call)
-        .where(
-            and_(
-                Call.destination_id == destination_id,
-                col(Call.connected_at).isnot(None),
-            )
-        )
-        .exists()
+    stmt = exists().where(
+        Call.destination_id == destination_id,
+        col(Call.connected_at).isnot(None),
     )
-    return bool(session.query(stmt).scalar())
+    return bool(session.scalar(select(stmt)))
 
 
 def user_is_in_call(user_id: UserPhone, session: Session) -> bool:
     """returns True if the user is in a call"""
-    stmt = select(Call).where(Call.user_id == user_id).exists()
-    return bool(session.query(stmt).scalar())
+    stmt = exists().where(Call.user_id == user_id)
+    return bool(session.scalar(select(stmt)))
 
 
 def add_call(  # noqa: PLR0913
@@ -95,16 +126,21 @@ def add_call(  # noqa: PLR0913
         type=type,
     )
     session.add(call)
-    session.commit()
     return get_call(provider_call_id, provider, session)
 
 
-def get_mep_number(call: Call) -> str:
+def get_mep_number(call: Call, session: Session) -> str:
     """returns the MEP number of the call"""
-    query = [x for x in call.destination.contacts if x.type == "phone"]
-    try:
-        return query[0].contact
-    except IndexError:
+    number = session.scalar(
+        select(Contact.contact)
+        .where(
+            Contact.destination_id == call.destination_id,
+            Contact.type == "phone",
+        )
+        .limit(1)
+    )
+    if number is None:
         raise CallError(
             f"Destination {call.destination_id} has no phone number to call"
-        ) from None
+        )
+    return number
@@ -2,22 +2,91 @@
 #
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+from __future__ import annotations
+
 import logging
 from random import choice
+from typing import TYPE_CHECKING, NamedTuple
 
 import httpx
+import phonenumbers
 
-from ...config import Language
+from ...config import Config, Language
 from .models import Number
 
 
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
 _logger = logging.getLogger(__name__)
 
 
+class ElksClient:
+    """Holds a shared HTTP client for talking to the 46elks API.
+
+    Reusing a single client allows keeping connections to 46elks alive between
+    requests, instead of doing a new TCP and TLS handshake for every SMS or
+    call we initiate.
+    """
+
+    client: httpx.Client | None = None
+
+    @classmethod
+    def get(cls) -> httpx.Client:
+        if cls.client is None:
+            provider_cfg = Config.get().telephony.provider
+            cls.client = httpx.Client(
+                base_url="https://api.46elks.com/a1",
+                auth=(provider_cfg.username, provider_cfg.password),
+                timeout=10,
+                limits=httpx.Limits(max_keepalive_connections=20),
+            )
+        return cls.client
+
+    @classmethod
+    def close(cls) -> None:
+        if cls.client is not None:
+            cls.client.close()
+            cls.client = None
+
+
+class PhoneNumbers(NamedTuple):
+    """Our phone numbers, additionally indexed by calling code and country."""
+
+    all: tuple[Number, ...]
+    by_calling_code: dict[str, tuple[Number, ...]]
+    by_country: dict[str, tuple[Number, ...]]
+
+    @classmethod
+    def index(cls, numbers: Sequence[Number]) -> PhoneNumbers:
+        by_calling_code: dict[str, list[Number]] = {}
+        by_country: dict[str, list[Number]] = {}
+        for number in numbers:
+            by_country.setdefault(number.country, []).append(number)
+            try:
+                calling_code = phonenumbers.parse(number.number).country_code
+            except phonenumbers.NumberParseException:
+                _logger.warning("cannot parse our number %s", number.number)
+                continue
+            by_calling_code.setdefault(str(calling_code), []).append(number)
+        return cls(
+            all=tuple(numbers),
+            by_calling_code={
+                code: tuple(numbers_)
+                for code, numbers_ in by_calling_code.items()
+            },
+            by_country={
+                country: tuple(numbers_)
+                for country, numbers_ in by_country.items()
+            },
+        )
+
+
 def choose_from_number(
     user_number_prefix: str,
     user_language: Language,
-    phone_numbers: list[Number],
+    phone_numbers: PhoneNumbers,
 ) -> Number:
     """
     Returns a phonenumber we use to call the user. Preferably from the same
@@ -25,46 +94,37 @@ def choose_from_number(
     it falls back on the users language. In case there is no match it returns
     any international number.
     """
-    number_prefix = [
-        n
-        for n in phone_numbers
-        if n.number.startswith(f"+{user_number_prefix}") == user_number_prefix
-    ]
+    number_prefix = phone_numbers.by_calling_code.get(user_number_prefix)
     if number_prefix:
         return choice(number_prefix)  # noqa: S311
 
     # we fall back on language as the closest approximation to the users
     # country for now
-    lang_numbers = [n for n in phone_numbers if n.country == user_language]
+    lang_numbers = phone_numbers.by_country.get(user_language)
     if lang_numbers:
         return choice(lang_numbers)  # noqa: S311
 
-    return choice(phone_numbers)  # noqa: S311
+    return choice(phone_numbers.all)  # noqa: S311
 
 
-def get_numbers(
-    phone_numbers: list[Number], auth: tuple[str, str]
-) -> list[Number]:
+def get_numbers() -> tuple[Number, ...]:
     """
     Fetches all available numbers of an account at 46elks.
     """
 
-    response = httpx.get(
-        url="https://api.46elks.com/a1/numbers", timeout=10, auth=auth
-    )
+    response = ElksClient.get().get("/numbers")
     if response.status_code != 200:  # noqa: PLR2004
         raise Exception(  # noqa: TRY002
             "Could not fetch numbers from 46elks. "
             f"Their http status: {response.status_code}"
         )
 
-    phone_numbers.clear()
-    phone_numbers.extend(
-        [Number.parse_obj(number) for number in response.json().get("data")]
+    phone_numbers = tuple(
+        Number.parse_obj(number) for number in response.json().get("data")
     )
     _logger.info(
-        "Currently available 46elks phone numbers: "
-        f"{[number.number for number in phone_numbers]}",
+        "Currently available 46elks phone numbers: %s",
+        [number.number for number in phone_numbers],
     )
 
     return phone_numbers
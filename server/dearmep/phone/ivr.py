@@ -3,10 +3,16 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
 import re
-from random import shuffle
+from collections import OrderedDict
+from functools import lru_cache
+from random import sample
+from threading import Lock
+from time import monotonic
 from typing import Optional
 
 from pydantic import UUID4
+from sqlalchemy import event
+from sqlalchemy.orm import SessionTransaction
 from sqlmodel import Session
 
 from ..config import Config
@@ -14,14 +20,97 @@ from ..convert import blobfile
 from ..database import query
 
 
+MEDIALIST_CACHE_SIZE = 4096
+MEDIALIST_CACHE_TTL = 60 * 60  # seconds
+# Key in `Session.info` for medialist IDs waiting for their session to commit.
+PENDING_MEDIALISTS_KEY = "dearmep_pending_medialists"
+
+ARGUMENTS = tuple(f"argument_{i}" for i in range(1, 9))
+
+# Maps (language, playlist) to (medialist ID, monotonic expiry time).
+_medialist_cache: OrderedDict[
+    tuple[str, tuple[str, ...]], tuple[UUID4, float]
+] = OrderedDict()
+_medialist_cache_lock = Lock()
+
+
+def clear_medialist_cache() -> None:
+    """Forget all medialist IDs remembered by `prepare_medialist`."""
+    with _medialist_cache_lock:
+        _medialist_cache.clear()
+
+
+def _cache_medialist(
+    key: tuple[str, tuple[str, ...]],
+    medialist_id: UUID4,
+) -> None:
+    with _medialist_cache_lock:
+        _medialist_cache[key] = (
+            medialist_id,
+            monotonic() + MEDIALIST_CACHE_TTL,
+        )
+        _medialist_cache.move_to_end(key)
+        if len(_medialist_cache) > MEDIALIST_CACHE_SIZE:
+            _medialist_cache.popitem(last=False)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_medialists(session: Session) -> None:
+    """Cache the medialist IDs prepared in a transaction that committed."""
+    for key, medialist_id in session.info.pop(
+        PENDING_MEDIALISTS_KEY, {}
+    ).items():
+        _cache_medialist(key, medialist_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_pending_medialists(
+    session: Session,
+    transaction: SessionTransaction,
+) -> None:
+    """Forget medialist IDs of a transaction that did not commit.
+
+    If it did commit, `_cache_committed_medialists` has already taken them.
+    """
+    if transaction.parent is None:
+        session.info.pop(PENDING_MEDIALISTS_KEY, None)
+
+
 def prepare_medialist(
-    session: Session, playlist: list[str], language: str
+    session: Session,
+    playlist: list[str],
+    language: str,
+    *,
+    cache: bool = True,
 ) -> UUID4:
     """
     Function to create a medialist and get it's id. This medialist_id can be
     given to the ffmpeg concat endpoint in `elks.get_concatenated_media` to
     play the flow to the user in IVR or play responses.
+
+    Since the same playlist in the same language always results in the same
+    medialist, the IDs are remembered in a (size-limited) cache, which spares
+    us the database lookups for playlists that have been prepared before. A
+    new ID is only cached once `session` commits, since the medialist might
+    not exist otherwise. Callers should therefore commit after preparing
+    their medialists, even if they changed nothing else. Set `cache` to
+    `False` for playlists that are unlikely to repeat, e.g. because they are
+    shuffled.
+    Changes to the contents of audio files or blobs are picked up within a
+    minute by `elks.get_concatenated_media`. Entries expire after
+    `MEDIALIST_CACHE_TTL` seconds, so that added or removed audio files or
+    blobs are picked up eventually. To pick them up immediately, call
+    `clear_medialist_cache` (or restart the application).
     """
+    key = (language, tuple(playlist))
+    if cache:
+        with _medialist_cache_lock:
+            if (cached := _medialist_cache.get(key)) is not None:
+                medialist_id, expires = cached
+                if expires > monotonic():
+                    _medialist_cache.move_to_end(key)
+                    return medialist_id
+                del _medialist_cache[key]
 
     medialist = blobfile.get_blobs_or_files(
         names=playlist,
@@ -30,11 +119,16 @@ def prepare_medialist(
         languages=(language, "en", ""),  # " " string needed
         suffix=".ogg",
     )
-    return query.store_medialist(
+    medialist_id = query.store_medialist(
         format="ogg", mimetype="audio/ogg", items=medialist, session=session
     )
 
+    if cache:
+        session.info.setdefault(PENDING_MEDIALISTS_KEY, {})[key] = medialist_id
+    return medialist_id
 
+
+@lru_cache(maxsize=256)
 def _group_filename(group_id: str) -> str:
     return (
         "group_"
@@ -76,23 +170,12 @@ def main_menu(
 
 def arguments(*, destination_id: str) -> list[str]:
     """IVR read arguments"""
-    arguments_ = [
-        "argument_1",
-        "argument_2",
-        "argument_3",
-        "argument_4",
-        "argument_5",
-        "argument_6",
-        "argument_7",
-        "argument_8",
-    ]
-    shuffle(arguments_)
     return [
         "arguments_campaign_intro",
         "arguments_choice_cancel_1",
         destination_id,
         "arguments_choice_cancel_2",
-        *arguments_,
+        *sample(ARGUMENTS, len(ARGUMENTS)),
         "arguments_end",
     ]
 
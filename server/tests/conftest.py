@@ -16,9 +16,11 @@ from pydantic.utils import deep_update
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
+from dearmep.convert.blobfile import BlobOrFile
 from dearmep.database.connection import AutoEngine, get_session
 from dearmep.database.models import Destination
 from dearmep.main import create_app
+from dearmep.phone import ivr
 from dearmep.ratelimit import Limit
 
 
@@ -116,6 +118,46 @@ def with_example_destinations(session: Session):
     return session
 
 
+@pytest.fixture
+def german_destinations(
+    with_example_destinations: Session,
+) -> tuple[Destination, Destination]:
+    """Add a second German destination and return both German ones.
+
+    This is for tests that need an alternative to Mierscheid, e.g. because
+    Mierscheid is in a call.
+    """
+    session = with_example_destinations
+    mustermann = Destination(
+        id="7d6ac8f4-3c32-4b5d-9d4c-5a0c8d1e2f30",
+        name="Max MUSTERMANN",
+        sort_name="MUSTERMANN Max",
+        country="de",
+    )
+    session.add(mustermann)
+    session.commit()
+    mierscheid = session.get(
+        Destination, "36e04ddf-73e7-4af6-a8af-24556d610f6d"
+    )
+    return mierscheid, mustermann
+
+
+@pytest.fixture
+def fake_audio_lookup(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    """Pretend that all IVR audio files exist, recording each lookup.
+
+    Returns the list that the names of each lookup will be appended to.
+    """
+    lookups: list[list[str]] = []
+
+    def get_blobs_or_files(*, names, **_kwargs) -> list[BlobOrFile]:
+        lookups.append(list(names))
+        return [BlobOrFile(Path("/audio", f"{name}.ogg")) for name in names]
+
+    monkeypatch.setattr(ivr.blobfile, "get_blobs_or_files", get_blobs_or_files)
+    return lookups
+
+
 @pytest.fixture
 def fastapi_factory(request: pytest.FixtureRequest, tmp_path: Path):
     """Provides the app factory.
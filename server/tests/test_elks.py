@@ -0,0 +1,289 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+# mypy: ignore-errors
+import datetime
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import ExitStack, contextmanager
+from io import BytesIO
+from os import environ
+from pathlib import Path
+from typing import NoReturn, Optional
+from uuid import uuid4
+
+import pytest
+import yaml
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from pydantic.utils import deep_update
+from sqlmodel import Session
+
+from dearmep.convert import ffmpeg
+from dearmep.convert.blobfile import BlobOrFile
+from dearmep.database import query
+from dearmep.database.models import Blob, Destination
+from dearmep.models import UserPhone
+from dearmep.phone import ivr
+from dearmep.phone.elks import elks, ongoing_calls
+
+
+@pytest.fixture
+def elks_app(fastapi_factory, session: Session):
+    """Return a function building the app with the given allowed 46elks IPs.
+
+    The test client's address is `testclient`, which is allowed by default.
+    """
+
+    def build(
+        allowed_ips: Sequence[str] = ("testclient",),
+        medialist_cache_dir: Optional[Path] = None,
+    ) -> FastAPI:
+        config_path = Path(environ["DEARMEP_CONFIG"])
+        with config_path.open("r", encoding="utf-8") as f:
+            config_dict = yaml.safe_load(f)
+        config_dict = deep_update(
+            config_dict,
+            {
+                "l10n": {
+                    "geo_mmdb": str(
+                        Path(Path(__file__).parent, "geo_ip", "test.mmdb")
+                    ),
+                },
+                "telephony": {
+                    "dry_run": True,
+                    "provider": {"allowed_ips": list(allowed_ips)},
+                    "medialist_cache_dir": medialist_cache_dir
+                    and str(medialist_cache_dir),
+                },
+            },
+        )
+        return fastapi_factory(config_dict)
+
+    return build
+
+
+def ivr_form(callid: str, result: str) -> dict[str, str]:
+    return {
+        "callid": callid,
+        "direction": "outgoing",
+        "from": "+46700000000",
+        "to": "+49123456789",
+        "result": result,
+    }
+
+
+def test_connect_suggests_other_mep_if_busy(
+    elks_app,
+    session: Session,
+    german_destinations: tuple[Destination, Destination],
+    monkeypatch,
+):
+    mierscheid, mustermann = german_destinations
+    monkeypatch.setattr(ivr, "prepare_medialist", lambda *_a, **_kw: uuid4())
+    client = TestClient(elks_app())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # Someone else is currently talking to Mierscheid.
+    other = ongoing_calls.add_call(
+        provider="46elks",
+        provider_call_id="other-call",
+        user_language="de",
+        user_id=UserPhone("+49621123456"),
+        destination_id=mierscheid.id,
+        session=session,
+        started_at=now,
+        type="INSTANT",
+    )
+    ongoing_calls.connect_call(other, session)
+    # We want to talk to Mierscheid too.
+    ongoing_calls.add_call(
+        provider="46elks",
+        provider_call_id="our-call",
+        user_language="de",
+        user_id=UserPhone("+49123456789"),
+        destination_id=mierscheid.id,
+        session=session,
+        started_at=now,
+        type="INSTANT",
+    )
+    session.commit()
+
+    res = client.post("/phone/connect", data=ivr_form("our-call", "3"))
+    assert res.status_code == status.HTTP_200_OK
+    assert res.json()["next"].endswith("/phone/connect")
+
+    # Our call has been re-added, suggesting the other MEP from Germany.
+    session.expire_all()
+    call = ongoing_calls.get_call("our-call", "46elks", session)
+    assert call.destination_id == mustermann.id
+    assert call.started_at == now
+    assert call.connected_at is None
+
+
+@pytest.fixture
+def fake_concat(monkeypatch) -> list[bytes]:
+    """Concatenate by simply joining the inputs, recording each result."""
+    results: list[bytes] = []
+
+    @contextmanager
+    def concat_stream(
+        inputs: Iterable[BlobOrFile], out_format: str
+    ) -> Iterator[BytesIO]:
+        with ExitStack() as stack:
+            data = b"".join(
+                stack.enter_context(item.get_path()).read_bytes()
+                for item in inputs
+            )
+        results.append(data)
+        yield BytesIO(data)
+
+    monkeypatch.setattr(ffmpeg, "concat_stream", concat_stream)
+    return results
+
+
+def test_concatenated_media_follows_changes(
+    elks_app,
+    session: Session,
+    fake_concat: list[bytes],
+    tmp_path: Path,
+    monkeypatch,
+):
+    # Recheck the contents on every request.
+    monkeypatch.setattr(elks, "medialist_path_ttl", 0)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "stale.ogg").write_bytes(b"from a previous run")
+    (cache_dir / ".stale.ogg.abc123").write_bytes(b"from a previous run")
+    (cache_dir / "notes.txt").write_bytes(b"not ours")
+    (cache_dir / "subdir.ogg").mkdir()
+    client = TestClient(elks_app(medialist_cache_dir=cache_dir))
+    # Our files are deleted at startup, anything else is left alone.
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        "notes.txt",
+        "subdir.ogg",
+    ]
+
+    audio = tmp_path / "hello.ogg"
+    audio.write_bytes(b"hello ")
+    blob = Blob(type="audio", mime_type="audio/ogg", name="x.ogg", data=b"x")
+    session.add(blob)
+    session.commit()
+    medialist_id = query.store_medialist(
+        session,
+        [BlobOrFile(audio), BlobOrFile(blob.id)],
+        format="ogg",
+        mimetype="audio/ogg",
+    )
+    session.commit()
+    url = f"/phone/medialist/{medialist_id}/concat.ogg"
+
+    def get() -> bytes:
+        res = client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        return res.content
+
+    assert get() == b"hello x"
+    assert get() == b"hello x"  # from the cache
+    assert fake_concat == [b"hello x"]
+
+    audio.write_bytes(b"hi ")
+    assert get() == b"hi x"
+
+    blob.data = b"y"
+    session.commit()
+    assert get() == b"hi y"
+    assert fake_concat == [b"hello x", b"hi x", b"hi y"]
+
+
+def test_origin_allowed(elks_app):
+    client = TestClient(elks_app(allowed_ips=("127.0.0.1", "testclient")))
+    # The request gets through to the route, which rejects the empty form.
+    res = client.post("/phone/main_menu")
+    assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    "path", ("/phone/main_menu", "/phone/connect", "/phone/hangup")
+)
+def test_origin_refused(elks_app, path: str):
+    client = TestClient(elks_app(allowed_ips=("127.0.0.1",)))
+    res = client.post(path)
+    assert res.status_code == status.HTTP_403_FORBIDDEN
+    assert res.json() == {
+        "detail": {
+            "error": "You don't look like an elk.",
+            "client_ip": "testclient",
+        },
+    }
+
+
+def test_origin_ignored_outside_prefix(elks_app):
+    client = TestClient(elks_app(allowed_ips=("127.0.0.1",)))
+    res = client.get("/api/v1/frontend-setup")
+    assert res.status_code == status.HTTP_200_OK
+    # Paths that merely start with the same string are not ours either.
+    for path in ("/phone", "/phonebook", "/phone-home"):
+        res = client.post(path)
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_origin_refused_below_root_path(elks_app):
+    client = TestClient(
+        elks_app(allowed_ips=("127.0.0.1",)), root_path="/dearmep"
+    )
+    res = client.post("/dearmep/phone/main_menu")
+    assert res.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_forward_to_caches_medialist(
+    elks_app,
+    session: Session,
+    german_destinations: tuple[Destination, Destination],
+    fake_audio_lookup: list[list[str]],
+):
+    mierscheid, _ = german_destinations
+    client = TestClient(elks_app())
+    ongoing_calls.add_call(
+        provider="46elks",
+        provider_call_id="our-call",
+        user_language="de",
+        user_id=UserPhone("+49123456789"),
+        destination_id=mierscheid.id,
+        session=session,
+        started_at=datetime.datetime.now(datetime.timezone.utc),
+        type="INSTANT",
+    )
+    session.commit()
+
+    # Pressing 1 in the main menu forwards to the connect route, twice.
+    for _ in range(2):
+        res = client.post("/phone/main_menu", data=ivr_form("our-call", "1"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["next"].endswith("/phone/connect")
+    # The second time, the medialist came from the cache.
+    assert fake_audio_lookup == [ivr.silence()]
+
+
+def test_concatenated_media_hit_skips_database(
+    elks_app,
+    session: Session,
+    fake_concat: list[bytes],
+    tmp_path: Path,
+    monkeypatch,
+):
+    client = TestClient(elks_app(medialist_cache_dir=tmp_path / "cache"))
+    audio = tmp_path / "hello.ogg"
+    audio.write_bytes(b"hello")
+    medialist_id = query.store_medialist(
+        session, [BlobOrFile(audio)], format="ogg", mimetype="audio/ogg"
+    )
+    session.commit()
+    url = f"/phone/medialist/{medialist_id}/concat.ogg"
+    assert client.get(url).content == b"hello"
+
+    def no_database(*_args, **_kwargs) -> NoReturn:
+        raise AssertionError("the database was queried")
+
+    monkeypatch.setattr(query, "get_medialist_by_id", no_database)
+    assert client.get(url).content == b"hello"
+    assert fake_concat == [b"hello"]
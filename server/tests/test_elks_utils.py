@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+# mypy: ignore-errors
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+import pytest
+
+from dearmep.phone.elks import elks, utils
+from dearmep.phone.elks.models import Number
+from dearmep.phone.elks.utils import PhoneNumbers, choose_from_number
+
+
+def number(number: str, country: str) -> Number:
+    now = datetime.now(timezone.utc)
+    return Number(
+        country=country,
+        expires=now,
+        number=number,
+        capabilities=["sms", "voice"],
+        cost=0,
+        active="yes",
+        allocated=now,
+        id=f"n{number}",
+    )
+
+
+SE = number("+46700000000", "se")
+DE = number("+4915100000000", "de")
+# A German number registered as Austrian, to tell the two lookups apart.
+DE_AT = number("+4915200000000", "at")
+
+
+@pytest.fixture
+def phone_numbers() -> PhoneNumbers:
+    return PhoneNumbers.index((SE, DE, DE_AT))
+
+
+def test_index(phone_numbers: PhoneNumbers):
+    assert phone_numbers.all == (SE, DE, DE_AT)
+    assert phone_numbers.by_calling_code == {"46": (SE,), "49": (DE, DE_AT)}
+    assert phone_numbers.by_country == {
+        "se": (SE,),
+        "de": (DE,),
+        "at": (DE_AT,),
+    }
+
+
+def test_index_skips_unparseable_calling_code():
+    broken = number("not a number", "fr")
+    phone_numbers = PhoneNumbers.index((SE, broken))
+    assert phone_numbers.all == (SE, broken)
+    assert phone_numbers.by_calling_code == {"46": (SE,)}
+    assert phone_numbers.by_country == {"se": (SE,), "fr": (broken,)}
+
+
+def test_choose_by_calling_code(phone_numbers: PhoneNumbers):
+    # The calling code wins over the language.
+    assert choose_from_number("46", "de", phone_numbers) == SE
+    for _ in range(10):
+        chosen = choose_from_number("49", "sv", phone_numbers)
+        assert chosen.number in {DE.number, DE_AT.number}
+
+
+def test_choose_falls_back_to_country(phone_numbers: PhoneNumbers):
+    assert choose_from_number("43", "at", phone_numbers) == DE_AT
+    assert choose_from_number("43", "de", phone_numbers) == DE
+
+
+def test_choose_falls_back_to_any(phone_numbers: PhoneNumbers):
+    for _ in range(10):
+        chosen = choose_from_number("33", "fr", phone_numbers)
+        assert chosen.number in {SE.number, DE.number, DE_AT.number}
+
+
+def test_refresh_during_lookup(monkeypatch):
+    """A lookup keeps using the numbers it started with."""
+    monkeypatch.setattr(elks, "phone_numbers", PhoneNumbers.index((SE, DE)))
+    monkeypatch.setattr(elks, "get_numbers", lambda: (DE_AT,))
+    orig_choice = utils.choice
+
+    def refresh_then_choose(numbers: Sequence[Number]) -> Number:
+        elks.refresh_phone_numbers()
+        return orig_choice(numbers)
+
+    monkeypatch.setattr(utils, "choice", refresh_then_choose)
+    assert choose_from_number("46", "sv", elks.phone_numbers) == SE
+    # The lookup above has replaced the numbers, in a single assignment.
+    assert elks.phone_numbers.all == (DE_AT,)
+    assert elks.phone_numbers.by_calling_code == {"49": (DE_AT,)}
@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+import logging
+import subprocess  # noqa: S404
+import sys
+from collections.abc import Sequence
+from typing import IO, Union
+
+import pytest
+
+from dearmep.convert import ffmpeg
+
+
+def test_concat_stream_logs_errors(monkeypatch, caplog):
+    def popen(
+        args: Sequence[str],
+        *,
+        stderr: Union[int, IO[bytes]],
+    ) -> subprocess.Popen:
+        # Stands in for an ffmpeg that fails after some partial output.
+        return subprocess.Popen(  # noqa: S603
+            (
+                sys.executable,
+                "-c",
+                "import sys; sys.stdout.write('partial'); "
+                "sys.stderr.write('No such file'); sys.exit(1)",
+            ),
+            bufsize=0,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+
+    monkeypatch.setattr(ffmpeg, "popen", popen)
+    with (
+        caplog.at_level(logging.ERROR, logger=ffmpeg.__name__),
+        pytest.raises(subprocess.CalledProcessError) as exc_info,
+        ffmpeg.concat_stream((), "ogg") as stdout,
+    ):
+        assert stdout.read() == b"partial"
+
+    assert exc_info.value.returncode == 1
+    assert exc_info.value.stderr == b"No such file"
+    assert "ffmpeg failed with exit code 1: No such file" in caplog.text
@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+# mypy: ignore-errors
+import pytest
+from fastapi import FastAPI
+from pydantic import UUID4
+from sqlmodel import Session
+
+from dearmep.database.models import Destination, MediaList
+from dearmep.phone import ivr
+
+
+@pytest.fixture
+def store_calls(fastapi_app: FastAPI, fake_audio_lookup, monkeypatch):
+    """Record the playlists that were stored as medialists."""
+    calls: list[list[str]] = []
+    store_medialist = ivr.query.store_medialist
+
+    def record_store_medialist(*, items, **kwargs) -> UUID4:  # noqa: ANN003
+        calls.append([str(item) for item in items])
+        return store_medialist(items=items, **kwargs)
+
+    monkeypatch.setattr(ivr.query, "store_medialist", record_store_medialist)
+    ivr.clear_medialist_cache()
+    yield calls
+    ivr.clear_medialist_cache()
+
+
+def test_medialist_cached_after_commit(session: Session, store_calls):
+    medialist_id = ivr.prepare_medialist(session, ["hello"], "de")
+    session.commit()
+
+    assert ivr.prepare_medialist(session, ["hello"], "de") == medialist_id
+    assert len(store_calls) == 1
+
+
+def test_medialist_not_cached_after_rollback(
+    session: Session,
+    german_destinations: tuple[Destination, Destination],
+    store_calls,
+):
+    mierscheid, _ = german_destinations
+    # Write something first, like the webhooks do. Else, pysqlite would not
+    # have begun a transaction yet, and releasing the medialist's SAVEPOINT
+    # would commit it right away.
+    mierscheid.name = "Jakob MIERSCHEID"
+    session.flush()
+    medialist_id = ivr.prepare_medialist(session, ["hello"], "de")
+    session.rollback()
+    assert session.get(MediaList, medialist_id) is None
+
+    # The rolled back ID must not be served from the cache.
+    medialist_id = ivr.prepare_medialist(session, ["hello"], "de")
+    assert len(store_calls) == 2  # noqa: PLR2004
+    session.commit()
+    assert session.get(MediaList, medialist_id) is not None
+
+
+def test_medialist_not_cached_without_commit(engine, store_calls):
+    with Session(engine) as session:
+        ivr.prepare_medialist(session, ["hello"], "de")
+        # Closed without committing.
+
+    with Session(engine) as session:
+        medialist_id = ivr.prepare_medialist(session, ["hello"], "de")
+        assert len(store_calls) == 2  # noqa: PLR2004
+        session.commit()
+        assert session.get(MediaList, medialist_id) is not None
@@ -7,8 +7,10 @@ from collections.abc import Iterable
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
 
 from dearmep.config import APP_NAME
+from dearmep.phone.elks.metrics import elks_metrics
 
 
 def metrics_lines_func(client: TestClient) -> Iterable[str]:
@@ -72,3 +74,33 @@ def test_no_unknown_paths(client: TestClient):
     assert [
         line for line in metrics_lines_func(client) if line.find(mark) != -1
     ]
+
+
+def test_elks_call_end_metrics():
+    labels = {"provider": "46elks", "destination_id": "test-call-end"}
+    end_labels = {
+        "provider": "46elks",
+        "destination_number": "test-call-end",
+        "our_number": "+46700000000",
+    }
+    for _ in range(2):
+        elks_metrics.observe_call_end(
+            destination_id="test-call-end",
+            our_number="+46700000000",
+            duration=60,
+            cost=12_000,
+        )
+    # Not connected, and free.
+    elks_metrics.observe_call_end(
+        destination_id="test-call-end",
+        our_number="+46700000000",
+        duration=None,
+        cost=None,
+    )
+
+    sample = REGISTRY.get_sample_value
+    assert sample("call_end_total", end_labels) == 3  # noqa: PLR2004
+    assert sample("call_duration_seconds_count", labels) == 2  # noqa: PLR2004
+    assert sample("call_duration_seconds_sum", labels) == 120  # noqa: PLR2004
+    assert sample("call_cost_euros_count", labels) == 2  # noqa: PLR2004
+    assert sample("call_cost_euros_sum", labels) == 2.4  # noqa: PLR2004
@@ -4,21 +4,27 @@
 
 # mypy: ignore-errors
 import datetime
-import secrets
+from itertools import count
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlmodel import delete
 
 from dearmep.database.connection import get_session
+from dearmep.database.models import Call
 from dearmep.models import UserPhone
 from dearmep.phone.elks import ongoing_calls
 
 
+# Call IDs only need to be unique within the test run.
+_call_ids = count()
+
+
 def test_ongoing_calls_interface(client: TestClient):
     """test the flow of a call"""
     with get_session() as session:
         provider = "46elks"
-        provider_call_id = secrets.token_hex(10)
+        provider_call_id = f"test-call-{next(_call_ids):010x}"
         user_language = "en"
         destination_id = "38595"
         user_id = UserPhone("+49123456789")
@@ -75,3 +81,70 @@ def test_ongoing_calls_interface(client: TestClient):
             call = ongoing_calls.get_call(provider_call_id, provider, session)
         assert provider_call_id in str(excinfo.value)
         assert provider in str(excinfo.value)
+
+
+def test_pop_call(client: TestClient):
+    """a call can only be popped once"""
+    with get_session() as session:
+        provider = "46elks"
+        provider_call_id = f"test-call-{next(_call_ids):010x}"
+        destination_id = "38595"
+
+        assert (
+            ongoing_calls.pop_call(provider_call_id, provider, session) is None
+        )
+
+        ongoing_calls.add_call(
+            provider=provider,
+            provider_call_id=provider_call_id,
+            user_language="en",
+            destination_id=destination_id,
+            user_id=UserPhone("+49123456789"),
+            session=session,
+            started_at=datetime.datetime.now(datetime.timezone.utc),
+            type="INSTANT",
+        )
+
+        call = ongoing_calls.pop_call(provider_call_id, provider, session)
+        session.commit()
+        assert call
+        assert call.provider_call_id == provider_call_id
+        # the popped call is still usable after the deletion was committed
+        assert call.destination_id == destination_id
+
+        with pytest.raises(ongoing_calls.CallError):
+            ongoing_calls.get_call(provider_call_id, provider, session)
+        assert (
+            ongoing_calls.pop_call(provider_call_id, provider, session) is None
+        )
+
+
+def test_pop_call_deleted_concurrently(client: TestClient, monkeypatch):
+    """a call deleted by someone else after looking it up is not popped"""
+    with get_session() as session:
+        provider = "46elks"
+        provider_call_id = f"test-call-{next(_call_ids):010x}"
+
+        ongoing_calls.add_call(
+            provider=provider,
+            provider_call_id=provider_call_id,
+            user_language="en",
+            destination_id="38595",
+            user_id=UserPhone("+49123456789"),
+            session=session,
+            started_at=datetime.datetime.now(datetime.timezone.utc),
+            type="INSTANT",
+        )
+
+        get_call = ongoing_calls.get_call
+
+        def get_call_then_delete(callid, provider, session) -> Call:
+            call = get_call(callid, provider, session)
+            # another request (e.g. a duplicate webhook) pops it meanwhile
+            session.execute(delete(Call).where(Call.id == call.id))
+            return call
+
+        monkeypatch.setattr(ongoing_calls, "get_call", get_call_then_delete)
+        assert (
+            ongoing_calls.pop_call(provider_call_id, provider, session) is None
+        )
@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: © 2026 DearMEP contributors
+#
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+# mypy: ignore-errors
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from sqlmodel import Session
+
+from dearmep.database import query
+from dearmep.database.models import Destination
+from dearmep.models import UserPhone
+from dearmep.phone.elks import ongoing_calls
+
+
+@pytest.fixture
+def destinations(
+    fastapi_app: FastAPI,  # for the config
+    german_destinations: tuple[Destination, Destination],
+) -> tuple[str, str]:
+    """Return the IDs of Mierscheid and Mustermann."""
+    return tuple(dest.id for dest in german_destinations)
+
+
+def add_call(session: Session, destination_id: str, *, connected: bool):
+    call = ongoing_calls.add_call(
+        provider="46elks",
+        provider_call_id=f"call-{destination_id}",
+        user_language="de",
+        user_id=UserPhone("+49621123456"),
+        destination_id=destination_id,
+        session=session,
+        started_at=datetime.now(timezone.utc),
+        type="INSTANT",
+    )
+    if connected:
+        ongoing_calls.connect_call(call, session)
+    session.commit()
+
+
+def test_recommender_skips_destination_in_call(
+    session: Session, destinations: tuple[str, str]
+):
+    mierscheid, mustermann = destinations
+    add_call(session, mierscheid, connected=True)
+    for _ in range(20):
+        dest = query.get_recommended_destination(session, country="DE")
+        assert dest.id == mustermann
+
+
+def test_recommender_keeps_destination_with_unconnected_call(
+    session: Session, destinations: tuple[str, str]
+):
+    mierscheid, mustermann = destinations
+    # Only Mierscheid remains, unless the unconnected call excludes them too.
+    add_call(session, mustermann, connected=True)
+    add_call(session, mierscheid, connected=False)
+    dest = query.get_recommended_destination(session, country="DE")
+    assert dest.id == mierscheid